@@ -1,22 +1,139 @@
 import os
 import json
-from flask import Flask, request, jsonify, send_file
+import shutil
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from functools import lru_cache
+from urllib.parse import quote
+from flask import Flask, Response, redirect, request, send_file
 from pan123 import Pan123  # 导入提供的pan123模块
 from werkzeug.utils import secure_filename
 import threading
 
+try:
+    import orjson
+except ImportError:  # 环境缺少orjson时退回标准库
+    orjson = None
+
 app = Flask(__name__)
 app.config['UPLOAD_FOLDER'] = './uploads'
 app.config['MAX_CONTENT_LENGTH'] = 16 * 1024 * 1024 * 1024  # 16GB
+# 部署在nginx后面时置为1，下载转发交给代理的sendfile，字节不经过Python
+app.config['USE_X_ACCEL'] = os.environ.get('USE_X_ACCEL', '0') == '1'
+app.use_x_sendfile = app.config['USE_X_ACCEL']
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-# 全局锁用于线程安全
-lock = threading.Lock()
+def ojsonify(obj, status=200):
+    """用orjson序列化响应，大目录列表比flask.jsonify快数倍"""
+    if orjson is not None:
+        body = orjson.dumps(obj)
+    else:
+        body = json.dumps(obj, ensure_ascii=False)
+    return Response(body, status=status, mimetype="application/json")
+
+@lru_cache(maxsize=4096)
+def _safe_filename(filename: str) -> str:
+    """memoize过的secure_filename，同名文件反复上传时省去正则开销"""
+    return secure_filename(filename)
+
+class ReadWriteLock:
+    """公平的读写锁：多个读者共享，写者独占
+
+    有写者排队时新读者也排队，持续的读流量不会把写者饿死。
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = False
+        self._writers_waiting = 0
+
+    @contextmanager
+    def read(self):
+        with self._cond:
+            while self._writer or self._writers_waiting > 0:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if self._readers == 0:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self):
+        with self._cond:
+            self._writers_waiting += 1
+            while self._writer or self._readers > 0:
+                self._cond.wait()
+            self._writers_waiting -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+# 目录/路径缓存的容量上限
+DIR_CACHE_MAXSIZE = 1024
+
+# 目录列表缓存：容量与有效期（秒）
+LIST_CACHE_MAXSIZE = 128
+LIST_CACHE_TTL = 30
+
+# 流式上传时留在内存的上限，超出后自动落到临时文件
+UPLOAD_SPOOL_MAXSIZE = 64 * 1024 * 1024
+
+# 文件大小单位表：(除数, 单位)
+_SIZE_UNITS = ((1 << 30, "GB"), (1 << 20, "MB"), (1 << 10, "KB"))
+
+
+@lru_cache(maxsize=2048)
+def _split_path(path: str) -> tuple:
+    """切分路径为段元组；客户端反复访问相同路径，结果做memoize"""
+    return tuple(p for p in path.split("/") if p)
+
+
+@lru_cache(maxsize=8192)
+def _format_size(size: int) -> str:
+    """格式化文件大小；大小在列表间高度重复，结果做memoize"""
+    for divisor, unit in _SIZE_UNITS:
+        if size > divisor:
+            return f"{round(size / divisor, 2)}{unit}"
+    return f"{size}B"
 
 class Pan123API:
     def __init__(self, config_path: str = "settings.json"):
         self.config_path = config_path
         self._load_config()
+        # (parent_id, 文件夹名) -> FileId，LRU淘汰
+        self._dir_cache = OrderedDict()
+        # (起始目录id, 累计路径) -> FileId，公共前缀可直接复用
+        self._path_cache = OrderedDict()
+        # parent_file_id -> (格式化的目录列表, 原始条目, 写入时间)，TTL+按策略淘汰
+        self._list_cache = OrderedDict()
+        # lfu策略下每个目录的访问次数
+        self._list_cache_freq = {}
+        self._cache_policy = self.config.get("cache-policy", "lru")
+        # 缓存操作独立加锁，命中时不与网络请求串行
+        self._cache_lock = threading.RLock()
+        # 列表类读操作共享，修改类操作独占
+        self._rw = ReadWriteLock()
+        # 按父目录细分的写锁，不同目录的修改可以并行
+        self._parent_locks = defaultdict(threading.Lock)
+        self._parent_locks_guard = threading.Lock()
+        # pan客户端本身非线程安全，网络请求期间独占
+        self._pan_lock = threading.RLock()
+        # 上次写入配置文件的内容，未变化时跳过写盘
+        self._last_saved_config = None
         self.pan = None
         self.login()
     
@@ -26,20 +143,32 @@ class Pan123API:
             "default-path": "",
             "user": "",
             "password": "",
-            "authorization": ""
+            "authorization": "",
+            # 目录列表缓存的淘汰策略："lru" 或 "lfu"
+            # 访问集中在少数热目录时lfu能让它们常驻，均匀访问用lru即可
+            "cache-policy": "lru"
         }
         
         if os.path.exists(self.config_path):
-            with open(self.config_path, "r", encoding="utf-8") as f:
-                try:
-                    config = json.load(f)
-                    self.config.update(config)
-                except json.JSONDecodeError:
-                    pass
+            with open(self.config_path, "rb") as f:
+                raw = f.read()
+            try:
+                if orjson is not None:
+                    config = orjson.loads(raw)
+                else:
+                    config = json.loads(raw)
+                self.config.update(config)
+            except ValueError:  # 两种实现的解析错误都是ValueError子类
+                pass
     
+    def _parent_lock(self, parent_id: int) -> threading.Lock:
+        """获取指定父目录对应的写锁"""
+        with self._parent_locks_guard:
+            return self._parent_locks[parent_id]
+
     def login(self):
         """登录并初始化网盘客户端"""
-        with lock:
+        with self._rw.write():
             self.pan = Pan123(
                 readfile=True,
                 user_name=self.config["user"],
@@ -59,105 +188,283 @@ class Pan123API:
     def _validate_default_path(self):
         """验证默认路径"""
         if self.config["default-path"]:
-            path_parts = [p for p in self.config["default-path"].split("/") if p]
-            current_dir = 0
-            
-            for part in path_parts:
-                dir_info = self._find_folder_by_name(current_dir, part)
-                if not dir_info:
-                    raise Exception("主目录不合法")
-                current_dir = dir_info["FileId"]
-    
+            path_parts = _split_path(self.config["default-path"])
+            if self._resolve_path(path_parts, 0) is None:
+                raise Exception("主目录不合法")
+
+    def _cache_get(self, cache, key):
+        """LRU读取：命中时移到末尾"""
+        with self._cache_lock:
+            value = cache.get(key)
+            if value is not None:
+                cache.move_to_end(key)
+            return value
+
+    def _cache_put(self, cache, key, value):
+        """LRU写入：超出容量时淘汰最旧条目"""
+        with self._cache_lock:
+            cache[key] = value
+            cache.move_to_end(key)
+            while len(cache) > DIR_CACHE_MAXSIZE:
+                cache.popitem(last=False)
+
+    def _resolve_path(self, path_parts, start_id):
+        """逐级解析路径段为目录id，优先命中路径缓存
+
+        返回最后一段对应的FileId，找不到时返回None。
+        """
+        current_id = start_id
+        resolved = 0
+        # 先从最长的累计路径前缀开始探测缓存，命中则跳过整段前缀解析
+        for end in range(len(path_parts), 0, -1):
+            cached = self._cache_get(
+                self._path_cache, (start_id, "/".join(path_parts[:end]))
+            )
+            if cached is not None:
+                current_id = cached
+                resolved = end
+                break
+
+        for i in range(resolved, len(path_parts)):
+            dir_info = self._find_folder_by_name(current_id, path_parts[i])
+            if not dir_info:
+                return None
+            current_id = dir_info["FileId"]
+            self._cache_put(
+                self._path_cache,
+                (start_id, "/".join(path_parts[:i + 1])),
+                current_id,
+            )
+        return current_id
+
     def _find_folder_by_name(self, parent_id: int, name: str):
         """通过名称查找文件夹"""
-        self.pan.parent_file_id = parent_id
-        self.pan.get_dir()
-        
-        for item in self.pan.list:
-            if item["Type"] == 1 and item["FileName"] == name:
-                return item
+        file_id = self._cache_get(self._dir_cache, (parent_id, name))
+        if file_id is not None:
+            return {"FileId": file_id, "FileName": name, "Type": 1}
+
+        # 未命中也先查列表缓存：不存在的名称（404路径）不该打到网络
+        items = self._get_dir_items(parent_id)
+        by_name = {item["FileName"]: item for item in items if item["Type"] == 1}
+        return by_name.get(name)
+
+    def _fetch_dir(self, parent_id: int):
+        """拉取目录内容，并一次性填充所有相关缓存
+
+        一次网络请求同时得到：格式化列表（供list）、原始条目（供parsing）、
+        文件夹名映射（供路径解析），后续任何一类访问都不再重复拉取。
+        """
+        with self._pan_lock:
+            self.pan.parent_file_id = parent_id
+            res_code = self.pan.get_dir()
+            if res_code != 0:
+                # 失败时pan.list仍是上一个目录的内容，绝不能格式化/入缓存
+                raise Exception(f"获取目录失败，错误码: {res_code}")
+            items = list(self.pan.list)
+
+        folders = []
+        files = []
+        for item in items:
+            if item["Type"] == 1:  # 文件夹
+                folders.append({
+                    "id": str(item["FileId"]),
+                    "name": item["FileName"]
+                })
+                self._cache_put(
+                    self._dir_cache, (parent_id, item["FileName"]), item["FileId"]
+                )
+            else:  # 文件
+                files.append({
+                    "id": str(item["FileId"]),
+                    "name": item["FileName"],
+                    "size": _format_size(item["Size"])
+                })
+
+        result = {"folder": folders, "file": files}
+        with self._cache_lock:
+            self._list_cache[parent_id] = (result, items, time.time())
+            self._list_cache.move_to_end(parent_id)
+            self._list_cache_freq[parent_id] = (
+                self._list_cache_freq.get(parent_id, 0) + 1
+            )
+            self._evict_list_cache()
+        return result, items
+
+    def _evict_list_cache(self):
+        """超出容量时按配置的策略淘汰；调用方需持有缓存锁"""
+        while len(self._list_cache) > LIST_CACHE_MAXSIZE:
+            if self._cache_policy == "lfu":
+                # 淘汰访问次数最少的目录，热目录不会被一轮冷目录遍历挤掉
+                victim = min(
+                    self._list_cache,
+                    key=lambda k: self._list_cache_freq.get(k, 0),
+                )
+                del self._list_cache[victim]
+                self._list_cache_freq.pop(victim, None)
+            else:
+                victim, _entry = self._list_cache.popitem(last=False)
+                self._list_cache_freq.pop(victim, None)
+
+    def _cached_listing(self, parent_id: int):
+        """读取未过期的缓存条目，没有命中时返回None"""
+        with self._cache_lock:
+            entry = self._list_cache.get(parent_id)
+            if entry is not None:
+                result, items, timestamp = entry
+                if time.time() - timestamp < LIST_CACHE_TTL:
+                    self._list_cache.move_to_end(parent_id)
+                    self._list_cache_freq[parent_id] = (
+                        self._list_cache_freq.get(parent_id, 0) + 1
+                    )
+                    return result, items
+                del self._list_cache[parent_id]
+                self._list_cache_freq.pop(parent_id, None)
+        return None
+
+    def _cached_get_dir(self, parent_id: int) -> dict:
+        """获取目录的格式化列表，优先命中缓存"""
+        cached = self._cached_listing(parent_id)
+        if cached is not None:
+            return cached[0]
+        return self._fetch_dir(parent_id)[0]
+
+    def _get_dir_items(self, parent_id: int) -> list:
+        """获取目录的原始条目列表，优先命中缓存"""
+        cached = self._cached_listing(parent_id)
+        if cached is not None:
+            return cached[1]
+        return self._fetch_dir(parent_id)[1]
+
+    def _invalidate(self, parent_id=None):
+        """写操作后保持缓存一致：只驱逐受影响目录的条目
+
+        parent_id为None表示受影响目录未知（罕见路径），整体清空。
+        """
+        with self._cache_lock:
+            if parent_id is None:
+                self._list_cache.clear()
+                self._list_cache_freq.clear()
+                self._dir_cache.clear()
+                self._path_cache.clear()
+                return
+            self._list_cache.pop(parent_id, None)
+            self._list_cache_freq.pop(parent_id, None)
+            for key in [k for k in self._dir_cache if k[0] == parent_id]:
+                del self._dir_cache[key]
+            for key in [k for k, v in self._path_cache.items() if v == parent_id]:
+                del self._path_cache[key]
+
+    def _invalidate_subtree(self, file_id):
+        """驱逐被删除节点自身及其已缓存后代的全部缓存条目
+
+        _dir_cache/_path_cache没有TTL，只清父目录的话被删文件夹
+        还能通过路径缓存继续浏览。
+        """
+        doomed = {file_id, str(file_id)}
+        try:
+            doomed.add(int(file_id))
+        except (TypeError, ValueError):
+            pass
+
+        with self._cache_lock:
+            # (parent, name) -> 子id：沿映射把已缓存的后代全部找出来
+            changed = True
+            while changed:
+                changed = False
+                for (pid, _name), fid in self._dir_cache.items():
+                    if pid in doomed and fid not in doomed:
+                        doomed.add(fid)
+                        doomed.add(str(fid))
+                        changed = True
+
+            for key in [
+                k for k, v in self._dir_cache.items()
+                if k[0] in doomed or v in doomed
+            ]:
+                del self._dir_cache[key]
+            for key in [k for k, v in self._path_cache.items() if v in doomed]:
+                del self._path_cache[key]
+            for pid in [p for p in self._list_cache if p in doomed]:
+                del self._list_cache[pid]
+                self._list_cache_freq.pop(pid, None)
+
+    def _parent_of(self, file_id) -> int:
+        """根据缓存反查file_id所在的父目录，查不到返回None"""
+        target = str(file_id)
+        with self._cache_lock:
+            for (parent_id, _name), fid in self._dir_cache.items():
+                if str(fid) == target:
+                    return parent_id
+            for parent_id, (result, _items, _timestamp) in self._list_cache.items():
+                for entry in result["folder"] + result["file"]:
+                    if entry["id"] == target:
+                        return parent_id
         return None
     
     def _save_config(self):
-        """保存配置"""
-        self.config["user"] = self.pan.user_name
-        self.config["password"] = self.pan.password
-        self.config["authorization"] = self.pan.authorization
-        
-        with open(self.config_path, "w", encoding="utf-8") as f:
-            json.dump(self.config, f, ensure_ascii=False, indent=2)
-    
-    def _format_size(self, size: int) -> str:
-        """格式化文件大小"""
-        if size > 1073741824:
-            return f"{round(size / 1073741824, 2)}GB"
-        elif size > 1048576:
-            return f"{round(size / 1048576, 2)}MB"
-        elif size > 1024:
-            return f"{round(size / 1024, 2)}KB"
+        """保存配置：内容未变时跳过写盘，写入用原子替换防止写坏文件"""
+        if self.pan is not None:
+            self.config["user"] = self.pan.user_name
+            self.config["password"] = self.pan.password
+            self.config["authorization"] = self.pan.authorization
+
+        if orjson is not None:
+            payload = orjson.dumps(self.config, option=orjson.OPT_INDENT_2)
         else:
-            return f"{size}B"
+            payload = json.dumps(
+                self.config, ensure_ascii=False, indent=2
+            ).encode("utf-8")
+        if payload == self._last_saved_config:
+            return
+
+        tmp_path = self.config_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, self.config_path)
+        self._last_saved_config = payload
     
     def list(self) -> dict:
         """列出当前目录下的文件和文件夹"""
-        with lock:
-            self.pan.get_dir()
-            folders = []
-            files = []
-            
-            for item in self.pan.list:
-                if item["Type"] == 1:  # 文件夹
-                    folders.append({
-                        "id": str(item["FileId"]),
-                        "name": item["FileName"]
-                    })
-                else:  # 文件
-                    files.append({
-                        "id": str(item["FileId"]),
-                        "name": item["FileName"],
-                        "size": self._format_size(item["Size"])
-                    })
-            
-            return {"folder": folders, "file": files}
-    
+        with self._rw.read():
+            return self._cached_get_dir(self.pan.parent_file_id)
+
     def list_folder(self, path: str) -> dict:
         """进入指定子目录"""
-        with lock:
-            path_parts = [p for p in path.split("/") if p]
-            current_id = self.pan.parent_file_id
-            
-            for part in path_parts:
-                dir_info = self._find_folder_by_name(current_id, part)
-                if not dir_info:
-                    return {"error": "没有找到对应文件夹或文件"}
-                current_id = dir_info["FileId"]
-            
+        with self._rw.read():
+            path_parts = _split_path(path)
+            current_id = self._resolve_path(path_parts, self.pan.parent_file_id)
+            if current_id is None:
+                return {"error": "没有找到对应文件夹或文件"}
+
             self.pan.parent_file_id = current_id
-            self.pan.get_dir()
-            return self.list()
+            return self._cached_get_dir(current_id)
     
     def parsing(self, file_path: str) -> dict:
         """解析文件路径获取下载链接"""
-        with lock:
-            path_parts = [p for p in file_path.split("/") if p]
-            current_id = self.pan.parent_file_id
-            
+        with self._rw.read():
+            path_parts = _split_path(file_path)
             # 定位到文件所在目录
-            for part in path_parts[:-1]:
-                dir_info = self._find_folder_by_name(current_id, part)
-                if not dir_info:
-                    return {"error": "没有找到对应文件夹或文件"}
-                current_id = dir_info["FileId"]
-            
-            self.pan.parent_file_id = current_id
-            self.pan.get_dir()
-            
+            current_id = self._resolve_path(path_parts[:-1], self.pan.parent_file_id)
+            if current_id is None:
+                return {"error": "没有找到对应文件夹或文件"}
+
             file_name = path_parts[-1]
-            for idx, item in enumerate(self.pan.list):
-                if item["Type"] != 1 and item["FileName"] == file_name:
-                    download_url = self.pan.link(idx)
-                    return {"url": download_url}
-            
+            # 路径解析或之前的list()已经拉过这个目录，直接复用条目
+            items = self._get_dir_items(current_id)
+
+            # 名称->序号索引，避免逐项比较文件名
+            by_name_file = {
+                item["FileName"]: idx
+                for idx, item in enumerate(items)
+                if item["Type"] != 1
+            }
+            idx = by_name_file.get(file_name)
+            if idx is not None:
+                with self._pan_lock:
+                    self.pan.parent_file_id = current_id
+                    self.pan.list = items
+                    return {"url": self.pan.link(idx)}
+
             return {"error": "没有找到对应文件"}
     
     def reload_session(self) -> dict:
@@ -170,29 +477,42 @@ class Pan123API:
     
     def create_folder(self, folder_name: str) -> dict:
         """创建新文件夹"""
-        with lock:
+        with self._pan_lock:
+            parent_id = self.pan.parent_file_id
+        with self._parent_lock(parent_id):
             try:
-                result = self.pan.new_folder(folder_name)
+                with self._pan_lock:
+                    # 并发的list_folder会改parent_file_id，调用前重新钉住，
+                    # 保证实际写入的目录和之后失效的目录一致
+                    self.pan.parent_file_id = parent_id
+                    result = self.pan.new_folder(folder_name)
                 if result.get("code") == 200:
+                    with self._rw.write():
+                        self._invalidate(parent_id)
                     return {"status": "success", "folder_id": str(result["data"]["fileId"])}
                 return {"error": "文件夹创建失败"}
             except Exception as e:
                 return {"error": str(e)}
-    
+
     def delete(self, file_id: str) -> dict:
         """删除文件/文件夹"""
-        with lock:
-            try:
+        # 先从缓存反查父目录，成功后只驱逐该目录的缓存
+        parent_id = self._parent_of(file_id)
+        try:
+            with self._pan_lock:
                 result = self.pan.delete(file_id)
-                if result.get("code") == 200:
-                    return {"status": "success"}
-                return {"error": "删除操作失败"}
-            except Exception as e:
-                return {"error": str(e)}
+            if result.get("code") == 200:
+                with self._rw.write():
+                    self._invalidate(parent_id)
+                    self._invalidate_subtree(file_id)
+                return {"status": "success"}
+            return {"error": "删除操作失败"}
+        except Exception as e:
+            return {"error": str(e)}
     
     def share(self, file_id: str) -> dict:
         """生成分享链接"""
-        with lock:
+        with self._rw.read(), self._pan_lock:
             try:
                 result = self.pan.share(file_id)
                 if result.get("code") == 200:
@@ -203,17 +523,108 @@ class Pan123API:
     
     def upload(self, file_path: str) -> dict:
         """上传本地文件"""
-        with lock:
+        # 网络上传只占父目录锁+pan锁，全局写锁仅在失效缓存时短暂持有，
+        # 上传期间读接口照常走缓存
+        with self._pan_lock:
+            parent_id = self.pan.parent_file_id
+        with self._parent_lock(parent_id):
             try:
-                result = self.pan.upload(file_path)
+                with self._pan_lock:
+                    self.pan.parent_file_id = parent_id
+                    result = self.pan.upload(file_path)
                 if result.get("code") == 200:
+                    with self._rw.write():
+                        self._invalidate(parent_id)
                     return {"status": "success", "file_id": str(result["data"]["fileId"])}
                 return {"error": "上传失败"}
             except Exception as e:
                 return {"error": str(e)}
 
-# 初始化API实例
-api = Pan123API()
+    def upload_stream(self, fileobj, filename: str) -> dict:
+        """从文件流直接上传，小文件全程不落盘"""
+        # 上传器需要可seek的对象：小于64MB留在内存，超出自动转临时文件
+        with tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_MAXSIZE) as spooled:
+            shutil.copyfileobj(fileobj, spooled, 1024 * 1024)
+            return self.upload_spooled(spooled, filename)
+
+    def upload_spooled(self, spooled, filename: str) -> dict:
+        """上传一个已经spool好的可seek文件对象"""
+        with self._pan_lock:
+            parent_id = self.pan.parent_file_id
+        with self._parent_lock(parent_id):
+            try:
+                with self._pan_lock:
+                    self.pan.parent_file_id = parent_id
+                    result = self.pan.up_load_stream(spooled, filename)
+                if result.get("code") == 0:
+                    with self._rw.write():
+                        self._invalidate(parent_id)
+                    return {"status": "success", "file_id": str(result["fileId"])}
+                return {"error": "上传失败"}
+            except Exception as e:
+                return {"error": str(e)}
+
+# API实例延迟初始化：导入时不再阻塞在网络登录上
+api = None
+_api_lock = threading.Lock()
+
+# 上传任务放入线程池执行，不长时间占用请求worker
+# job_id -> [future, 完成时间]，完成后超过TTL未被取走就清理，
+# 客户端拿到202后不再轮询也不会永久泄漏任务记录
+UPLOAD_JOB_TTL = 300
+_upload_pool = ThreadPoolExecutor(max_workers=4)
+_upload_jobs = {}
+_upload_jobs_lock = threading.Lock()
+
+def _prune_upload_jobs():
+    """清理完成后长期无人认领的上传任务"""
+    now = time.time()
+    with _upload_jobs_lock:
+        stale = [job_id for job_id, (_, done_at) in _upload_jobs.items()
+                 if done_at is not None and now - done_at > UPLOAD_JOB_TTL]
+        for job_id in stale:
+            del _upload_jobs[job_id]
+
+def get_api() -> Pan123API:
+    """获取API实例，首次请求时才构造（双重检查锁）"""
+    global api
+    if api is None:
+        with _api_lock:
+            if api is None:
+                api = Pan123API()
+    return api
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """健康检查，不触发网盘登录"""
+    return ojsonify({"status": "ok"})
+
+def _persist_credentials(username: str, password: str,
+                         config_path: str = "settings.json"):
+    """把提交的凭据直接写入配置文件
+
+    不依赖Pan123API实例：配置里存着失效凭据时实例构造会登录失败，
+    新凭据必须先落盘，下次构造才能用上。
+    """
+    config = {}
+    if os.path.exists(config_path):
+        with open(config_path, "rb") as f:
+            raw = f.read()
+        try:
+            config = orjson.loads(raw) if orjson is not None else json.loads(raw)
+        except ValueError:
+            pass
+    config["user"] = username
+    config["password"] = password
+
+    if orjson is not None:
+        payload = orjson.dumps(config, option=orjson.OPT_INDENT_2)
+    else:
+        payload = json.dumps(config, ensure_ascii=False, indent=2).encode("utf-8")
+    tmp_path = config_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(payload)
+    os.replace(tmp_path, config_path)
 
 @app.route('/api/login', methods=['POST'])
 def login():
@@ -221,48 +632,70 @@ def login():
     data = request.json
     username = data.get('username')
     password = data.get('password')
-    
+
     if username and password:
-        # 更新配置
-        api.config['user'] = username
-        api.config['password'] = password
-        api._save_config()
-    
+        # 先持久化凭据再构造实例：存量凭据失效导致构造失败时，
+        # 新凭据也已写盘，重试即可用上
+        _persist_credentials(username, password)
+        if api is not None:
+            api.config['user'] = username
+            api.config['password'] = password
+
     try:
-        api.login()
-        return jsonify({"status": "success"})
+        client = get_api()
+        client.login()
+        return ojsonify({"status": "success"})
     except Exception as e:
-        return jsonify({"error": str(e)}), 401
+        return ojsonify({"error": str(e)}, 401)
 
 @app.route('/api/list', methods=['GET'])
 def list_files():
     """列出当前目录文件"""
     try:
-        return jsonify(api.list())
+        return ojsonify(get_api().list())
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return ojsonify({"error": str(e)}, 500)
 
 @app.route('/api/list/<path:sub_path>', methods=['GET'])
 def list_subfolder(sub_path):
     """列出子目录文件"""
     try:
-        result = api.list_folder(sub_path)
+        result = get_api().list_folder(sub_path)
         if 'error' in result:
-            return jsonify(result), 404
-        return jsonify(result)
+            return ojsonify(result, 404)
+        return ojsonify(result)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return ojsonify({"error": str(e)}, 500)
 
 @app.route('/api/parsing/<path:file_path>', methods=['GET'])
 def get_download_link(file_path):
     """获取文件下载链接"""
     try:
-        result = api.parsing(file_path)
+        result = get_api().parsing(file_path)
         if 'error' in result:
-            return jsonify(result), 404
-        return jsonify(result)
+            return ojsonify(result, 404)
+        return ojsonify(result)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return ojsonify({"error": str(e)}, 500)
+
+@app.route('/api/download/<path:file_path>', methods=['GET'])
+def download_file(file_path):
+    """下载文件：解析直链后转交代理/客户端，文件字节不经过Python"""
+    try:
+        result = get_api().parsing(file_path)
+        if 'error' in result:
+            return ojsonify(result, 404)
+        if app.config['USE_X_ACCEL']:
+            # nginx内部转发：由代理回源并sendfile给客户端，worker立即释放
+            # header值必须是latin-1且经过URI转义，网盘URL里可能带中文文件名
+            target = quote(result["url"], safe=":/?&=%")
+            return Response(
+                status=200,
+                headers={"X-Accel-Redirect": "/_pan_download/" + target},
+            )
+        return redirect(result["url"], code=302)
+    except Exception as e:
+        return ojsonify({"error": str(e)}, 500)
 
 @app.route('/api/share', methods=['POST'])
 def share_file():
@@ -271,44 +704,78 @@ def share_file():
     file_id = data.get('file_id')
     
     if not file_id:
-        return jsonify({"error": "缺少file_id参数"}), 400
+        return ojsonify({"error": "缺少file_id参数"}, 400)
     
     try:
-        result = api.share(file_id)
+        result = get_api().share(file_id)
         if 'error' in result:
-            return jsonify(result), 400
-        return jsonify(result)
+            return ojsonify(result, 400)
+        return ojsonify(result)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return ojsonify({"error": str(e)}, 500)
 
 @app.route('/api/upload', methods=['POST'])
 def upload_file():
-    """上传文件"""
+    """上传文件（异步任务，返回job_id供轮询）"""
     if 'file' not in request.files:
-        return jsonify({"error": "未选择文件"}), 400
-    
+        return ojsonify({"error": "未选择文件"}, 400)
+
     file = request.files['file']
     if file.filename == '':
-        return jsonify({"error": "未选择文件"}), 400
-    
-    # 保存文件到临时目录
-    filename = secure_filename(file.filename)
-    save_path = os.path.join(app.config['UPLOAD_FOLDER'], filename)
-    file.save(save_path)
-    
+        return ojsonify({"error": "未选择文件"}, 400)
+
+    # 直接把请求流交给上传器，不再先存盘再重读
+    filename = _safe_filename(file.filename)
+
     try:
-        result = api.upload(save_path)
-        # 删除临时文件
-        if os.path.exists(save_path):
-            os.remove(save_path)
-            
-        if 'error' in result:
-            return jsonify(result), 400
-        return jsonify(result)
+        # 请求结束后流就失效，先spool下来再交给线程池
+        spooled = tempfile.SpooledTemporaryFile(max_size=UPLOAD_SPOOL_MAXSIZE)
+        shutil.copyfileobj(file.stream, spooled, 1024 * 1024)
+
+        def _run_upload():
+            try:
+                return get_api().upload_spooled(spooled, filename)
+            finally:
+                spooled.close()
+
+        _prune_upload_jobs()
+        job_id = uuid.uuid4().hex
+        entry = [None, None]
+        future = _upload_pool.submit(_run_upload)
+        entry[0] = future
+        with _upload_jobs_lock:
+            _upload_jobs[job_id] = entry
+
+        def _mark_done(_):
+            with _upload_jobs_lock:
+                entry[1] = time.time()
+        future.add_done_callback(_mark_done)
+        return ojsonify({"status": "pending", "job_id": job_id}, 202)
+    except Exception as e:
+        return ojsonify({"error": str(e)}, 500)
+
+@app.route('/api/upload/<job_id>', methods=['GET'])
+def upload_status(job_id):
+    """查询上传任务状态"""
+    _prune_upload_jobs()
+    with _upload_jobs_lock:
+        entry = _upload_jobs.get(job_id)
+    if entry is None:
+        return ojsonify({"error": "任务不存在"}, 404)
+    future = entry[0]
+    if not future.done():
+        return ojsonify({"status": "pending", "job_id": job_id})
+
+    try:
+        result = future.result()
     except Exception as e:
-        if os.path.exists(save_path):
-            os.remove(save_path)
-        return jsonify({"error": str(e)}), 500
+        result = {"error": str(e)}
+    # 结果已取走，释放任务记录
+    with _upload_jobs_lock:
+        _upload_jobs.pop(job_id, None)
+    if 'error' in result:
+        return ojsonify(result, 400)
+    return ojsonify(result)
 
 @app.route('/api/delete', methods=['POST'])
 def delete_file():
@@ -317,15 +784,15 @@ def delete_file():
     file_id = data.get('file_id')
     
     if not file_id:
-        return jsonify({"error": "缺少file_id参数"}), 400
+        return ojsonify({"error": "缺少file_id参数"}, 400)
     
     try:
-        result = api.delete(file_id)
+        result = get_api().delete(file_id)
         if 'error' in result:
-            return jsonify(result), 400
-        return jsonify(result)
+            return ojsonify(result, 400)
+        return ojsonify(result)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return ojsonify({"error": str(e)}, 500)
 
 @app.route('/api/create_folder', methods=['POST'])
 def create_folder():
@@ -334,26 +801,27 @@ def create_folder():
     folder_name = data.get('folder_name')
     
     if not folder_name:
-        return jsonify({"error": "缺少folder_name参数"}), 400
+        return ojsonify({"error": "缺少folder_name参数"}, 400)
     
     try:
-        result = api.create_folder(folder_name)
+        result = get_api().create_folder(folder_name)
         if 'error' in result:
-            return jsonify(result), 400
-        return jsonify(result)
+            return ojsonify(result, 400)
+        return ojsonify(result)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return ojsonify({"error": str(e)}, 500)
 
 @app.route('/api/reload', methods=['POST'])
 def reload_session():
     """重新加载会话"""
     try:
-        result = api.reload_session()
+        result = get_api().reload_session()
         if 'error' in result:
-            return jsonify(result), 400
-        return jsonify(result)
+            return ojsonify(result, 400)
+        return ojsonify(result)
     except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        return ojsonify({"error": str(e)}, 500)
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    # threaded=True让I/O密集的接口在等待网盘响应时互相重叠
+    app.run(host='0.0.0.0', port=5000, debug=True, threaded=True)
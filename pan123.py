@@ -1,13 +1,36 @@
 import hashlib
 import json
+import mmap
 import os
 import re
 import time
 
 import uuid
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 
+def _build_session():
+    """构建带连接池与重试的会话，复用TCP/TLS连接"""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=16,
+        pool_maxsize=64,
+        max_retries=Retry(
+            total=3,
+            backoff_factor=0.2,
+            status_forcelist=[429, 500, 502, 503, 504],
+        ),
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# 模块级共享会话，所有接口调用走同一个连接池
+_session = _build_session()
+
 
 class Pan123:
     def __init__(
@@ -70,7 +93,7 @@ class Pan123:
         retry_count = 0
         while retry_count < max_retries:
             try:
-                login_res = requests.post(
+                login_res = _session.post(
                     url,
                     headers=headers,
                     data=data,
@@ -157,7 +180,7 @@ class Pan123:
                 "OnlyLookAbnormalFile": 0,
             }
             try:
-                a = requests.get(base_url, headers=self.header_logined, params=params, timeout=10)  # , verify=False)
+                a = _session.get(base_url, headers=self.header_logined, params=params, timeout=10)  # , verify=False)
             except:
                 print("连接失败")
                 return -1
@@ -215,7 +238,7 @@ class Pan123:
 
         # sign = getSign("/a/api/file/download_info")
 
-        link_res = requests.post(
+        link_res = _session.post(
             down_request_url,
             headers=self.header_logined,
             # params={sign[0]: sign[1]},
@@ -229,7 +252,7 @@ class Pan123:
             # print(linkRes.json())
             return res_code_download
         down_load_url = link_res.json()["data"]["DownloadUrl"]
-        next_to_get = requests.get(down_load_url, timeout=10, allow_redirects=False).text
+        next_to_get = _session.get(down_load_url, timeout=10, allow_redirects=False).text
         url_pattern = re.compile(r"href='(https?://[^']+)'")
         redirect_url = url_pattern.findall(next_to_get)[0]
         if showlink:
@@ -255,7 +278,7 @@ class Pan123:
         if not os.path.exists(download_path):
             print("文件夹不存在，创建文件夹")
             os.makedirs(download_path)
-        down = requests.get(down_load_url, stream=True, timeout=10)
+        down = _session.get(down_load_url, stream=True, timeout=10)
 
         file_size = int(down.headers["Content-Length"])  # 文件大小
         content_size = int(file_size)  # 文件总大小
@@ -311,7 +334,7 @@ class Pan123:
                 + str(recycle_id)
                 + "&trashed=true&&Page=1"
         )
-        recycle_res = requests.get(url, headers=self.header_logined, timeout=10)
+        recycle_res = _session.get(url, headers=self.header_logined, timeout=10)
         json_recycle = recycle_res.json()
         recycle_list = json_recycle["data"]["InfoList"]
         self.recycle_list = recycle_list
@@ -340,7 +363,7 @@ class Pan123:
             "fileTrashInfoList": file_detail,
             "operation": operation,
         }
-        delete_res = requests.post(
+        delete_res = _session.post(
             "https://www.123pan.com/a/api/file/trash",
             data=json.dumps(data_delete),
             headers=self.header_logined,
@@ -381,7 +404,7 @@ class Pan123:
                 "sharePwd": share_pwd,
                 "event": "shareCreate"
             }
-            share_res = requests.post(
+            share_res = _session.post(
                 "https://www.123pan.com/a/api/share/create",
                 headers=self.header_logined,
                 data=json.dumps(data),
@@ -400,6 +423,120 @@ class Pan123:
         else:
             print("退出分享")
 
+    def up_load_stream(self, fileobj, file_name, fsize=None, duplicate=2):
+        """从可seek的文件对象直接上传，不经过本地磁盘
+
+        非交互版本：遇到同名文件按duplicate参数处理（默认2保留两者）。
+        成功返回 {"code": 0, "fileId": ...}，失败返回 {"code": 错误码}。
+        """
+        if fsize is None:
+            fileobj.seek(0, os.SEEK_END)
+            fsize = fileobj.tell()
+
+        fileobj.seek(0)
+        md5 = hashlib.md5()
+        while True:
+            data = fileobj.read(1024 * 1024)
+            if not data:
+                break
+            md5.update(data)
+        readable_hash = md5.hexdigest()
+
+        list_up_request = {
+            "driveId": 0,
+            "etag": readable_hash,
+            "fileName": file_name,
+            "parentFileId": self.parent_file_id,
+            "size": fsize,
+            "type": 0,
+            "duplicate": duplicate,
+        }
+        up_res = _session.post(
+            "https://www.123pan.com/b/api/file/upload_request",
+            headers=self.header_logined,
+            data=json.dumps(list_up_request),
+            timeout=10
+        )
+        up_res_json = up_res.json()
+        res_code_up = up_res_json["code"]
+        if res_code_up != 0:
+            print(up_res_json)
+            print("上传请求失败")
+            return {"code": res_code_up}
+
+        up_file_id = up_res_json["data"]["FileId"]
+        if up_res_json["data"]["Reuse"]:
+            print("上传成功，文件已MD5复用")
+            return {"code": 0, "fileId": up_file_id}
+
+        bucket = up_res_json["data"]["Bucket"]
+        storage_node = up_res_json["data"]["StorageNode"]
+        upload_key = up_res_json["data"]["Key"]
+        upload_id = up_res_json["data"]["UploadId"]
+
+        # 分块，每一块取一次链接，依次上传
+        block_size = 5242880
+        fileobj.seek(0)
+        part_number_start = 1
+        while True:
+            data = fileobj.read(block_size)
+            if not data:
+                break
+            get_link_data = {
+                "bucket": bucket,
+                "key": upload_key,
+                "partNumberEnd": part_number_start + 1,
+                "partNumberStart": part_number_start,
+                "uploadId": upload_id,
+                "StorageNode": storage_node,
+            }
+            get_link_res = _session.post(
+                "https://www.123pan.com/b/api/file/s3_repare_upload_parts_batch",
+                headers=self.header_logined,
+                data=json.dumps(get_link_data),
+                timeout=10
+            )
+            get_link_res_json = get_link_res.json()
+            if get_link_res_json["code"] != 0:
+                return {"code": get_link_res_json["code"]}
+            upload_url = get_link_res_json["data"]["presignedUrls"][
+                str(part_number_start)
+            ]
+            _session.put(upload_url, data=data, timeout=10)
+            part_number_start = part_number_start + 1
+
+        # 完成标志
+        uploaded_comp_data = {
+            "bucket": bucket,
+            "key": upload_key,
+            "uploadId": upload_id,
+            "storageNode": storage_node,
+        }
+        _session.post(
+            "https://www.123pan.com/b/api/file/s3_complete_multipart_upload",
+            headers=self.header_logined,
+            data=json.dumps(uploaded_comp_data),
+            timeout=10
+        )
+
+        # 报告完成上传，关闭upload session
+        if fsize > 64 * 1024 * 1024:
+            time.sleep(3)
+        close_up_session_res = _session.post(
+            "https://www.123pan.com/b/api/file/upload_complete",
+            headers=self.header_logined,
+            data=json.dumps({"fileId": up_file_id}),
+            timeout=10
+        )
+        close_res_json = close_up_session_res.json()
+        res_code_up = close_res_json["code"]
+        if res_code_up == 0:
+            print("上传成功")
+            return {"code": 0, "fileId": up_file_id}
+        print("上传失败")
+        print(close_res_json)
+        return {"code": res_code_up}
+
     def up_load(self, file_path):
         file_path = file_path.replace('"', "")
         file_path = file_path.replace("\\", "/")
@@ -414,11 +551,11 @@ class Pan123:
         fsize = os.path.getsize(file_path)
         with open(file_path, "rb") as f:
             md5 = hashlib.md5()
-            while True:
-                data = f.read(64 * 1024)
-                if not data:
-                    break
-                md5.update(data)
+            if fsize > 0:
+                # 整个文件一次性交给hashlib：内部大块处理并释放GIL，
+                # 由OpenSSL走硬件加速的摘要实现
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    md5.update(mm)
             readable_hash = md5.hexdigest()
 
         list_up_request = {
@@ -432,7 +569,7 @@ class Pan123:
         }
 
         # sign = getSign("/b/api/file/upload_request")
-        up_res = requests.post(
+        up_res = _session.post(
             "https://www.123pan.com/b/api/file/upload_request",
             headers=self.header_logined,
             # params={sign[0]: sign[1]},
@@ -452,7 +589,7 @@ class Pan123:
                 print("取消上传")
                 return
             # sign = getSign("/b/api/file/upload_request")
-            up_res = requests.post(
+            up_res = _session.post(
                 "https://www.123pan.com/b/api/file/upload_request",
                 headers=self.header_logined,
                 # params={sign[0]: sign[1]},
@@ -487,7 +624,7 @@ class Pan123:
             "uploadId": upload_id,
             "storageNode": storage_node,
         }
-        start_res = requests.post(
+        start_res = _session.post(
             "https://www.123pan.com/b/api/file/s3_list_upload_parts",
             headers=self.header_logined,
             data=json.dumps(start_data),
@@ -531,7 +668,7 @@ class Pan123:
                 get_link_url = (
                     "https://www.123pan.com/b/api/file/s3_repare_upload_parts_batch"
                 )
-                get_link_res = requests.post(
+                get_link_res = _session.post(
                     get_link_url,
                     headers=self.header_logined,
                     data=json.dumps(get_link_data),
@@ -550,7 +687,7 @@ class Pan123:
                     str(part_number_start)
                 ]
                 # print("上传链接",uploadUrl)
-                requests.put(upload_url, data=data, timeout=10)
+                _session.put(upload_url, data=data, timeout=10)
                 # print("put")
 
                 part_number_start = part_number_start + 1
@@ -566,7 +703,7 @@ class Pan123:
             "storageNode": storage_node,
         }
         # print(uploadedCompData)
-        requests.post(
+        _session.post(
             uploaded_list_url,
             headers=self.header_logined,
             data=json.dumps(uploaded_comp_data),
@@ -575,7 +712,7 @@ class Pan123:
         compmultipart_up_url = (
             "https://www.123pan.com/b/api/file/s3_complete_multipart_upload"
         )
-        requests.post(
+        _session.post(
             compmultipart_up_url,
             headers=self.header_logined,
             data=json.dumps(uploaded_comp_data),
@@ -588,7 +725,7 @@ class Pan123:
         close_up_session_url = "https://www.123pan.com/b/api/file/upload_complete"
         close_up_session_data = {"fileId": up_file_id}
         # print(closeUpSessionData)
-        close_up_session_res = requests.post(
+        close_up_session_res = _session.post(
             close_up_session_url,
             headers=self.header_logined,
             data=json.dumps(close_up_session_data),
@@ -693,7 +830,7 @@ class Pan123:
             "operateType": 1,
         }
         # sign = getSign("/a/api/file/upload_request")
-        res_mk = requests.post(
+        res_mk = _session.post(
             url,
             headers=self.header_logined,
             data=json.dumps(data_mk),